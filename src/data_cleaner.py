@@ -1,4 +1,53 @@
-import re
+import numpy as np
+import pandas as pd
+
+# Unit suffixes and their divisors to grams, looked up by the text following the number
+_UNIT_DIVISORS = {
+    'mg': 1000,
+    'µg': 1_000_000,
+    'mcg': 1_000_000,
+    'micro': 1_000_000,
+    'perc': 1,
+    '°c': 1,
+    'g': 1,
+}
+_NUMBER_CHARS = '+-.0123456789 '
+_DIGITS = '0123456789'
+
+
+def _scan_number(value):
+    """
+    Returns the first number in a string as a float, or None if there is none.
+    Single left-to-right scan matching what re.search(r"[-+]?\d*\.?\d+") would find.
+    """
+    length = len(value)
+    for start in range(length):
+        digits_start = start + 1 if value[start] in '+-' else start
+        end = digits_start
+        while end < length and value[end] in _DIGITS:
+            end += 1
+        if end + 1 < length and value[end] == '.' and value[end + 1] in _DIGITS:
+            end += 2
+            while end < length and value[end] in _DIGITS:
+                end += 1
+            return float(value[start:end])
+        if end > digits_start:
+            return float(value[start:end])
+    return None
+
+
+def _extract_number(value):
+    """
+    Returns the first number in a string as a float, or None if there is none.
+    Values that start with the number (the common '12.5 mg' shape) are converted with a
+    single float() call; anything else falls back to the character scan.
+    """
+    unit = value.lstrip(_NUMBER_CHARS)
+    try:
+        return float(value[:len(value) - len(unit)])
+    except ValueError:
+        return _scan_number(value)
+
 
 class DataProcessor:
     """Class for processing XML data and cleaning nutritional data."""
@@ -22,21 +71,14 @@ class DataProcessor:
         """
         if isinstance(value, str):
             value = value.strip().lower()
-            has_number = any(char.isdigit() for char in value)
-
-            if has_number:
-                if 'mg' in value:
-                    return float(value.replace('mg', '').strip()) / 1000
-                elif 'µg' in value:
-                    return float(value.replace('µg', '').strip()) / 1_000_000
-                elif 'micro' in value:
-                    return float(value.replace('micro', '').strip()) / 1_000_000
-                elif 'g' in value:
-                    return float(value.replace('g', '').strip())
-                elif 'perc' in value:
-                    return float(value.replace('perc', '').strip())
-                elif '°c' in value:
-                    return float(value.replace('°c', '').strip())
+            unit = value.lstrip(_NUMBER_CHARS)
+            divisor = _UNIT_DIVISORS.get(unit)
+
+            if divisor is not None:
+                try:
+                    return float(value[:len(value) - len(unit)]) / divisor
+                except ValueError:
+                    pass  # No valid number in front of the unit
 
         return value  # Return unchanged if not numeric
 
@@ -57,13 +99,11 @@ class DataProcessor:
         if isinstance(value, str):
             value = value.strip().lower()
 
-            # Extract numeric part using regex
-            num_match = re.search(r"[-+]?\d*\.?\d+", value)
-            if not num_match:
+            # Extract the numerical value without going through the regex engine
+            num = _extract_number(value)
+            if num is None:
                 return value  # Return as-is if no number is found
 
-            num = float(num_match.group())  # Extract the numerical value
-
             # Check for unit and scale accordingly
             if "mg" in value:
                 return num / 1000  # Convert mg to g
@@ -77,12 +117,101 @@ class DataProcessor:
         return value  # Return original if not a string
 
 
+    @staticmethod
+    def clean_series(series):
+        """
+        Vectorized equivalent of clean_value for a whole column:
+        - Works on the distinct values only, as nutrition columns repeat the same strings a lot
+        - Extracts the leading numeric part with a single str.extract pass
+        - Looks up the unit divisor for the whole column at once instead of per-cell branching
+
+        Args:
+            series (pd.Series): Column of raw values.
+
+        Returns:
+            pd.Series: Cleaned column; cells without a number and a known unit are
+                       returned the same way clean_value would return them.
+        """
+        try:
+            codes, uniques = pd.factorize(series)
+        except TypeError:
+            return series.map(DataProcessor.clean_value)  # Unhashable cells (lists, dicts) cannot be factorized
+
+        # Only strings are cleaned, every other value is returned unchanged
+        raw = pd.Series(uniques, dtype=object)
+        is_str = np.fromiter((isinstance(value, str) for value in uniques), dtype=bool, count=len(uniques))
+        if not is_str.any():
+            return series  # Nothing but missing or non-string values
+
+        values = raw[is_str].str.strip().str.lower()
+
+        # Same split as clean_value: the leading number, then the unit that selects the divisor
+        number_parts = values.str.extract(r'^([-+. 0-9]*)', expand=False).str.strip()
+        numbers = pd.to_numeric(number_parts, errors='coerce').to_numpy(dtype=np.float64)
+        divisors = values.str.lstrip(_NUMBER_CHARS).map(_UNIT_DIVISORS).to_numpy(dtype=np.float64)
+
+        converted = ~np.isnan(numbers) & ~np.isnan(divisors)
+        cleaned = raw.to_numpy(dtype=object, copy=True)
+        cleaned[is_str] = values.mask(converted, numbers / divisors).to_numpy(dtype=object)
+
+        # Map the cleaned distinct values back onto the rows, leaving missing cells as they were
+        result = pd.Series(cleaned[codes], index=series.index, name=series.name)
+        return result.where(codes != -1, series).infer_objects()
+
+    @staticmethod
+    def clean_columns(df, columns):
+        """
+        Cleans several columns in one go: the values of all columns are stacked into a
+        single array and passed through clean_series once, so values shared between
+        columns (e.g. '0 g') are parsed only once and the pandas overhead is paid once.
+
+        Args:
+            df (pd.DataFrame): DataFrame to clean in place.
+            columns (list): Column names to clean.
+
+        Returns:
+            pd.DataFrame: DataFrame with the cleaned columns.
+        """
+        if not columns:
+            return df
+
+        stacked = pd.Series(df[columns].to_numpy(dtype=object).ravel(), dtype=object)
+        cleaned = DataProcessor.clean_series(stacked).to_numpy(dtype=object).reshape(len(df), len(columns))
+
+        cleaned_df = pd.DataFrame(cleaned, index=df.index, columns=columns).infer_objects()
+        for col in columns:
+            df[col] = cleaned_df[col]
+        return df
+
+    @staticmethod
+    def convert_to_category(df, columns):
+        """
+        Converts columns with heavily repeated string values to the 'category' dtype,
+        which stores each distinct value once and speeds up grouping and filtering.
+
+        Args:
+            df (pd.DataFrame): DataFrame to convert in place.
+            columns (list): Column names to convert; missing ones and columns holding
+                            unhashable values (e.g. lists of labels) are skipped.
+
+        Returns:
+            pd.DataFrame: DataFrame with the converted columns.
+        """
+        for col in columns:
+            if col in df.columns:
+                try:
+                    df[col] = df[col].astype('category')
+                except TypeError:
+                    pass  # Unhashable cells (lists, dicts) cannot be categories, keep the column as is
+        return df
+
     @staticmethod
     def clean_nutrition_data(df):
         """
         Cleans the nutrition data by:
         - Removing 'g', 'mg', 'micro', 'perc', and '°C'
         - Converting appropriate units to float
+        - Storing repeated descriptive columns (course, cuisine, difficulty, ...) as categories
 
         Args:
             df (pd.DataFrame): DataFrame containing nutritional data.
@@ -94,14 +223,16 @@ class DataProcessor:
         excluded_columns = ['Fogás', 'Konyha', 'Nehézség', 'Elkészítési idő', 'Szakács elkészítette', 
                             'Speciális étrendek', 'Vegetáriánus', 'Alkalom', 'Költség egy főre', 
                             'Konyhatechnológia']
+        categorical_columns = ['Fogás', 'Konyha', 'Nehézség', 'Vegetáriánus', 'Alkalom',
+                               'Költség egy főre', 'Konyhatechnológia']
         
-        for index, col in enumerate(df.columns):
-            if index in excluded_indexes or col in excluded_columns:
-                continue
-            if df[col].dtype == 'object':
-                df[col] = df[col].apply(lambda x: DataProcessor.clean_value(x))
+        columns_to_clean = [
+            col for index, col in enumerate(df.columns)
+            if index not in excluded_indexes and col not in excluded_columns and df[col].dtype == 'object'
+        ]
+        df = DataProcessor.clean_columns(df, columns_to_clean)
         
-        return df
+        return DataProcessor.convert_to_category(df, categorical_columns)
    
     @staticmethod
     def clean_nutrition_data_ingredients(df):
@@ -109,7 +240,7 @@ class DataProcessor:
         Cleans numerical nutrition data by:
         - Removing units like 'g', 'mg', 'µg', 'micro'
         - Converting to float and scaling appropriately
-        - Keeping non-numeric columns unchanged
+        - Keeping non-numeric columns unchanged, storing the category columns as 'category' dtype
 
         Args:
         df (pd.DataFrame): The dataframe containing nutritional data.
@@ -118,10 +249,9 @@ class DataProcessor:
         pd.DataFrame: Cleaned dataframe with corrected values.
         """
         excluded_columns = ['Alapanyag neve', 'Elsődleges kategória', 'Másodlagos kategória']
+        categorical_columns = ['Elsődleges kategória', 'Másodlagos kategória']
 
-        for col in df.columns:
-            if col in excluded_columns:
-                continue  # Skip non-numeric columns
-            if df[col].dtype == 'object':
-                df[col] = df[col].apply(lambda x: DataProcessor.clean_value(x))
-        return df
\ No newline at end of file
+        # Skip non-numeric columns
+        columns_to_clean = [col for col in df.columns if col not in excluded_columns and df[col].dtype == 'object']
+        df = DataProcessor.clean_columns(df, columns_to_clean)
+        return DataProcessor.convert_to_category(df, categorical_columns)
\ No newline at end of file
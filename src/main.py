@@ -1,9 +1,22 @@
+import asyncio
+import os
 import time
+import aiohttp
+import orjson
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+from aiohttp_client_cache import CachedSession, SQLiteBackend
+from aiohttp_client_cache.cache_control import DO_NOT_CACHE
 import traceback
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from functools import partial
+from itertools import chain
 from .scraper import RecipeScraper
 from .scraper import IngredientScraper
+from .scraper import CACHE_EXPIRE_AFTER
 from .data_cleaner import DataProcessor
 from .price_downloader import PriceDownloader
 #-----------------------------------------------
@@ -18,71 +31,300 @@ from .price_downloader import PriceDownloader
 #     r'C:\Users\Bálint\Desktop\Asztal\Projekt\inputs\receptek_url_3.xml'
 # ]
 
+# Function to extract URLs from several sitemap files
+def extract_urls(file_paths, scraper_class, executor_class=ThreadPoolExecutor):
+    """
+    Extracts the scraper class's URLs from every XML file, one executor worker per file,
+    and drops duplicate URLs.
+
+    Args:
+        file_paths (list): Paths to the sitemap XML files.
+        scraper_class (type): RecipeScraper or IngredientScraper.
+        executor_class (type): Executor to parse the files with. Threads by default, as the
+                               driver code is not under a __main__ guard. XML parsing holds the
+                               GIL, so threads are no faster than a serial loop; only
+                               ProcessPoolExecutor, called from a guarded entry point, parses
+                               the files in parallel.
+
+    Returns:
+        list: Unique URLs from all files, in order of first appearance.
+    """
+    extract = partial(scraper_class.extract_urls_from_xml, check_url_format=True)
+    with executor_class(max_workers=max(1, len(file_paths))) as executor:
+        urls = list(chain.from_iterable(executor.map(extract, file_paths)))
+
+    # Sitemaps can list the same URL more than once, and every duplicate would cost a full scrape
+    unique_urls = list(dict.fromkeys(urls))
+    print(f"Extracted {len(unique_urls)} unique URLs out of {len(urls)} "
+          f"({len(urls) - len(unique_urls)} duplicates removed).")
+    return unique_urls
+
+
 # # Extract and categorize URLs
-# recipe_urls = []
-# ingredient_urls = []
+# recipe_urls = extract_urls(file_paths, RecipeScraper)
+# ingredient_urls = extract_urls(file_paths, IngredientScraper)
+
+# Maximum number of HTTP requests in flight at once
+MAX_CONCURRENCY = 50
+
+
+async def needs_revalidation(session, url):
+    """
+    Checks whether the cached copy of a URL is older than CACHE_EXPIRE_AFTER. Such pages are
+    revalidated with a conditional GET (If-None-Match / If-Modified-Since), and a 304 answer
+    reuses the cached body. Stale pages without an ETag or Last-Modified header cannot be
+    revalidated, so they are dropped from the cache and fetched again in full.
+    """
+    key = session.cache.create_key('GET', url)
+    cached = await session.cache.get_response(key)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)  # created_at is naive UTC
+    if cached is None or now - cached.created_at <= CACHE_EXPIRE_AFTER:
+        return False
+    if 'ETag' in cached.headers or 'Last-Modified' in cached.headers:
+        return True
+    await session.cache.delete(key)
+    return False
+
+
+async def fetch_cached(session, url):
+    """Fetch a URL through the cache, revalidating a stale copy first, and return its HTML."""
+    refresh = await needs_revalidation(session, url)
+    async with session.get(url, refresh=refresh) as response:
+        response.raise_for_status()
+        html = await response.read()
+
+        if refresh and response.from_cache:
+            # A 304 hands back the old cache entry unchanged; save it again so its
+            # created_at moves forward and the freshness window starts over
+            try:
+                await session.cache.save_response(response, session.cache.create_key('GET', url))
+            except Exception as e:
+                print(f"Could not refresh the cache entry for {url}: {e}")
+
+        return html
 
-# for file_path in file_paths:
-#     recipe_urls.extend(RecipeScraper.extract_urls_from_xml(file_path, check_url_format=True))
-#     ingredient_urls.extend(IngredientScraper.extract_urls_from_xml(file_path, check_url_format=True))
 
-# # Function to process URLs and scrape data
-# def process_scraping(urls, scraper_class, category):
-#     """Scrape URLs using the given scraper class and store results."""    
-#     scraped_data = []
-#     success_count = 0
-#     total_count = len(urls)
+async def fetch(session, semaphore, url):
+    """Fetch a single URL, returning (url, html) or (url, None) on failure."""
+    async with semaphore:
+        try:
+            try:
+                html = await fetch_cached(session, url)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                raise
+            except Exception as e:
+                # A cache backend failure (e.g. a locked or corrupt SQLite file) must not abort
+                # the whole run, so fetch this URL again without reading or writing the cache
+                print(f"Cache failed for {url}, fetching it without the cache: {e}")
+                async with session.get(url, expire_after=DO_NOT_CACHE) as response:
+                    response.raise_for_status()
+                    html = await response.read()
+
+            return url, html
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Error fetching {url}: {e}")
+            return url, None
+
+
+def parse_html(url, html, scraper_class):
+    """
+    Parse fetched HTML with the given scraper class into a record dict.
+
+    Kept at module level so it can be pickled and sent to a ProcessPoolExecutor.
+    """
+    return scraper_class(url, html=html).to_record()
+
+
+async def fetch_and_parse(session, semaphore, executor, url, scraper_class):
+    """Fetch a URL and hand its HTML to the executor, so parsing overlaps with other fetches."""
+    url, html = await fetch(session, semaphore, url)
+    if html is None:
+        return url, None
+
+    loop = asyncio.get_running_loop()
+    try:
+        return url, await loop.run_in_executor(executor, parse_html, url, html, scraper_class)
+    except Exception as e:
+        print(f"Error processing {url}: {e}")
+        print(traceback.format_exc())
+        return url, None
+
 
-#     print(f"Starting to scrape {total_count} {category} URLs...")
+async def scrape_urls(urls, scraper_class, category, executor, checkpoint=None):
+    """
+    Fetch URLs concurrently and parse each page as soon as it arrives.
+    If a checkpoint file is given, every scraped record is appended to it as a JSON line.
 
-#     for i, url in enumerate(urls, start=1):
-#         try:
-#             scraper = scraper_class(url)
-#             scraped_df = scraper.to_dataframe()
+    Returns:
+        dict: Mapping of URL to its scraped record, in the order of the input URLs
+              rather than the order the pages finished in.
+    """
+    scraped_records = {}
+    success_count = 0
+    total_count = len(urls)
+    start_time = time.time()
 
-#             if scraped_df is not None and not scraped_df.empty:
-#                 scraped_data.append(scraped_df)
-#                 success_count += 1  # Count only successful scrapes
+    print(f"Starting to scrape {total_count} {category} URLs...")
 
-#         except Exception as e:
-#             print(f"Error processing {url}: {e}")
-#             print(traceback.format_exc())
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    connector = aiohttp.TCPConnector(limit=MAX_CONCURRENCY, limit_per_host=20, keepalive_timeout=30)
+    timeout = aiohttp.ClientTimeout(total=10)
+    # Entries are kept past CACHE_EXPIRE_AFTER so their validators remain available, see needs_revalidation
+    cache = SQLiteBackend('nosalty_aiohttp_cache.sqlite')
 
-#         # Print periodic progress updates
-#         if i % 500 == 0 or i == total_count:
-#             elapsed_time = time.time() - start_time
-#             print(f"Processed {i}/{total_count} {category} URLs. "
-#                   f"Successful: {success_count}. Elapsed time: {elapsed_time:.2f} seconds.")
+    async with CachedSession(cache=cache, connector=connector, timeout=timeout) as session:
+        tasks = [fetch_and_parse(session, semaphore, executor, url, scraper_class) for url in urls]
+
+        for i, task in enumerate(asyncio.as_completed(tasks), start=1):
+            url, record = await task
+
+            if record:
+                scraped_records[url] = record
+                success_count += 1  # Count only successful scrapes
+                if checkpoint is not None:
+                    checkpoint.write(orjson.dumps({'url': url, 'record': record}) + b'\n')
+
+            # Print periodic progress updates
+            if i % 500 == 0 or i == total_count:
+                if checkpoint is not None:
+                    checkpoint.flush()
+                elapsed_time = time.time() - start_time
+                print(f"Processed {i}/{total_count} {category} URLs. "
+                      f"Successful: {success_count}. Elapsed time: {elapsed_time:.2f} seconds.")
+
+    return {url: scraped_records[url] for url in urls if url in scraped_records}
+
+
+def load_checkpoint(checkpoint_path):
+    """
+    Load the records saved by a previous run from a JSON Lines checkpoint file.
+
+    Returns:
+        dict: Mapping of URL to its scraped record; empty if the file does not exist.
+    """
+    records = {}
+    if not os.path.exists(checkpoint_path):
+        return records
+
+    with open(checkpoint_path, 'rb') as f:
+        for line in f:
+            try:
+                entry = orjson.loads(line)
+                records[entry['url']] = entry['record']
+            except (orjson.JSONDecodeError, KeyError, TypeError):
+                continue  # Skip a broken or foreign line, that URL is simply scraped again
+    return records
+
+
+def trim_partial_line(checkpoint_path):
+    """
+    Cut off a last line left unfinished by a crash, so records appended on resume
+    start on a line of their own instead of being glued to the broken fragment.
+    """
+    if not os.path.exists(checkpoint_path):
+        return
+
+    with open(checkpoint_path, 'rb+') as f:
+        end = f.seek(0, os.SEEK_END)
+        if end == 0:
+            return
+        f.seek(end - 1)
+        if f.read(1) == b'\n':
+            return
+
+        # Read backwards in blocks until the last complete line ends
+        pos = end
+        while pos > 0:
+            start = max(0, pos - 4096)
+            f.seek(start)
+            newline = f.read(pos - start).rfind(b'\n')
+            if newline != -1:
+                f.truncate(start + newline + 1)
+                return
+            pos = start
+        f.truncate(0)  # Not a single complete line
+
+
+# Function to process URLs and scrape data
+def process_scraping(urls, scraper_class, category, checkpoint_path=None,
+                     executor_class=ThreadPoolExecutor, max_workers=32):
+    """
+    Scrape URLs using the given scraper class and store results.
+
+    Args:
+        urls (list): URLs to scrape.
+        scraper_class (type): RecipeScraper or IngredientScraper.
+        category (str): Label used in progress messages.
+        checkpoint_path (str): Optional JSON Lines file each record is appended to as soon as
+                               it is scraped. URLs already in the file are not scraped again,
+                               so an interrupted run can be restarted where it stopped.
+        executor_class (type): Executor used for HTML parsing. Pass ProcessPoolExecutor
+                               to spread parsing over all cores (bypasses the GIL).
+        max_workers (int): Number of parser workers.
+
+    Returns:
+        list: Scraped record dicts in the order of the input URLs, to be turned into
+              one DataFrame with pd.DataFrame.from_records.
+    """
+    done = load_checkpoint(checkpoint_path) if checkpoint_path else {}
+    previous_count = sum(url in done for url in urls)
+    if previous_count:
+        print(f"Resuming from checkpoint: {previous_count} {category} URLs already scraped.")
+    remaining_urls = [url for url in urls if url not in done]
+    if checkpoint_path:
+        trim_partial_line(checkpoint_path)
+
+    checkpoint_file = open(checkpoint_path, 'ab') if checkpoint_path else nullcontext()
+    with executor_class(max_workers=max_workers) as executor, checkpoint_file as checkpoint:
+        done.update(asyncio.run(scrape_urls(remaining_urls, scraper_class, category, executor, checkpoint)))
+
+    # Checkpointed and freshly scraped records are returned in the order of the input URLs
+    return [done[url] for url in urls if url in done]
+
+
+def save_to_csv(df, output_path):
+    """
+    Save a DataFrame to CSV with pyarrow's multithreaded C++ writer.
+
+    Falls back to pandas' to_csv when pyarrow cannot type or write a column
+    (e.g. a column still mixing cleaned numbers with raw strings, or holding lists).
+    """
+    try:
+        pa_csv.write_csv(pa.Table.from_pandas(df, preserve_index=False), output_path)
+    except pa.ArrowException:
+        df.to_csv(output_path, index=False)
 
-#     return scraped_data
 
 # start_time = time.time()
 # current_date = datetime.now().strftime("%Y_%m_%d")
 # # Process and scrape recipe data
-# recipe_data = process_scraping(recipe_urls, RecipeScraper, "recipe")
+# recipe_checkpoint_path = rf"C:\Users\Bálint\Desktop\Asztal\Projekt\outputs\recipes_{current_date}.jsonl"
+# recipe_data = process_scraping(recipe_urls, RecipeScraper, "recipe", checkpoint_path=recipe_checkpoint_path)
 
 # # Convert and clean recipe data
 # if recipe_data:
-#     final_recipe_df = pd.concat(recipe_data, ignore_index=True)
+#     final_recipe_df = pd.DataFrame.from_records(recipe_data)
 #     final_recipe_df_cleaned = DataProcessor.clean_nutrition_data(final_recipe_df)
 
 #     # Save to CSV
 #     recipe_output_path = rf"C:\Users\Bálint\Desktop\Asztal\Projekt\outputs\recipes_scraping_{current_date}.csv"
-#     final_recipe_df_cleaned.to_csv(recipe_output_path, index=False)
+#     save_to_csv(final_recipe_df_cleaned, recipe_output_path)
 #     print(f"Saved cleaned recipe data to {recipe_output_path}")
 
 
 # # Process and scrape ingredient data
-# ingredient_data = process_scraping(ingredient_urls, IngredientScraper, "ingredient")
+# ingredient_checkpoint_path = rf"C:\Users\Bálint\Desktop\Asztal\Projekt\outputs\ingredients_{current_date}.jsonl"
+# ingredient_data = process_scraping(ingredient_urls, IngredientScraper, "ingredient",
+#                                    checkpoint_path=ingredient_checkpoint_path)
 
 # # Convert and clean ingredient data
 # if ingredient_data:
-#     final_ingredient_df = pd.concat(ingredient_data, ignore_index=True)
+#     final_ingredient_df = pd.DataFrame.from_records(ingredient_data)
 #     final_ingredient_df_cleaned = DataProcessor.clean_nutrition_data_ingredients(final_ingredient_df)
 
 #     # Save to CSV
 #     ingredient_output_path = rf"C:\Users\Bálint\Desktop\Asztal\Projekt\outputs\ingredients_scraping_{current_date}.csv"
-#     final_ingredient_df_cleaned.to_csv(ingredient_output_path, index=False)
+#     save_to_csv(final_ingredient_df_cleaned, ingredient_output_path)
 #     print(f"Saved cleaned ingredient data to {ingredient_output_path}")
 
 # # Final execution time
@@ -1,20 +1,78 @@
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from requests_cache import CachedSession
+from bs4 import BeautifulSoup, SoupStrainer
 import pandas as pd
 import re
 import time
-from datetime import datetime
+from collections import defaultdict
+from datetime import datetime, timedelta
+from functools import lru_cache
 import xml.etree.ElementTree as ET
 
+# Scraped pages are cached on disk for a week, so reruns skip the network for unchanged URLs.
+# Older pages are revalidated with a conditional GET (ETag / Last-Modified), a 304 reuses the cached body.
+CACHE_EXPIRE_AFTER = timedelta(days=7)
+
+# Shared HTTP session, so repeated requests to nosalty.hu reuse pooled keep-alive connections
+SESSION = CachedSession('nosalty_cache.sqlite', backend='sqlite', expire_after=CACHE_EXPIRE_AFTER)
+SESSION.mount('https://', HTTPAdapter(pool_connections=50, pool_maxsize=50, max_retries=3))
+SESSION.mount('http://', HTTPAdapter(pool_connections=50, pool_maxsize=50, max_retries=3))
+
+# Sitemap XML namespace and compiled URL format check, shared by both scrapers
+SITEMAP_NS = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+_URL_RE = re.compile(r"^(http|https)://[^\s/$.?#].[^\s]*$")
+
+
+@lru_cache(maxsize=None)
+def _parse_lastmod(date_text):
+    """Parses a 'YYYY-MM-DD' lastmod value, cached since sitemaps repeat the same dates."""
+    try:
+        return datetime.strptime(date_text, "%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+def iter_sitemap_entries(file_path):
+    """
+    Streams (loc, lastmod) pairs from a sitemap XML file.
+
+    Uses iterparse and clears every processed <url> element, so memory stays flat
+    regardless of the sitemap size instead of materializing the whole tree.
+
+    Args:
+        file_path (str): Path to the XML file.
+
+    Yields:
+        tuple: (loc text, lastmod text or None) for every <url> entry with a <loc>.
+    """
+    root = None
+    for event, elem in ET.iterparse(file_path, events=('start', 'end')):
+        if root is None:
+            root = elem  # The first start event is the <urlset> root
+            continue
+        if event != 'end' or elem.tag != SITEMAP_NS + 'url':
+            continue
+
+        loc = elem.find(SITEMAP_NS + 'loc')
+        lastmod = elem.find(SITEMAP_NS + 'lastmod')
+        if loc is not None:
+            yield loc.text, lastmod.text if lastmod is not None else None
+
+        root.clear()  # Drop processed entries from the root as well
 
 class RecipeScraper:
     """Class for scraping full details of a recipe from Nosalty."""
 
     BASE_URL = "https://www.nosalty.hu/recept/"
+    # Only the title and the detail boxes (with their contents) are parsed into the soup.
+    # The strainer sees the raw class string, so multi-class tags need a regex match.
+    PARSE_ONLY = SoupStrainer(class_=re.compile(r'(?:^|\s)(?:p-article__title|p-recipe__detailsBody)(?:\s|$)'))
 
-    def __init__(self, url):
+    def __init__(self, url, html=None):
         self.url = url
-        self.soup = self.get_soup()
+        self.soup = self.parse_soup(html) if html is not None else self.get_soup()
+        self.class_index = self.build_class_index()
 
     @staticmethod
     def extract_urls_from_xml(file_path, check_url_format=False, date_range=None):
@@ -32,58 +90,68 @@ class RecipeScraper:
         """
         def is_valid_url(url):
             """Validates URL format."""
-            pattern = r"^(http|https)://[^\s/$.?#].[^\s]*$"
-            return re.match(pattern, url) is not None
+            return _URL_RE.match(url) is not None
 
         def is_within_date_range(date_text, start_date, end_date):
             """Checks if the date falls within the specified range."""
-            try:
-                date = datetime.strptime(date_text, "%Y-%m-%d")
-                return start_date <= date <= end_date
-            except ValueError:
-                return False
-
-        # Define XML namespace
-        namespace = {'ns': 'http://www.sitemaps.org/schemas/sitemap/0.9'}
+            date = _parse_lastmod(date_text)
+            return date is not None and start_date <= date <= end_date
 
-        # Parse XML
-        tree = ET.parse(file_path)
-        root = tree.getroot()
+        # Parse the range bounds once instead of for every URL
+        if date_range:
+            start_date, end_date = map(lambda d: datetime.strptime(d, "%Y-%m-%d"), date_range)
 
         urls = []
-        for url in root.findall('ns:url', namespace):
-            loc = url.find('ns:loc', namespace)
-            lastmod = url.find('ns:lastmod', namespace)
-
-            if loc is not None:
-                url_text = loc.text
-                if not url_text.startswith(RecipeScraper.BASE_URL):
+        for url_text, lastmod_text in iter_sitemap_entries(file_path):
+            if not url_text.startswith(RecipeScraper.BASE_URL):
+                continue
+            if check_url_format and not is_valid_url(url_text):
+                continue
+            if date_range and lastmod_text is not None:
+                if not is_within_date_range(lastmod_text, start_date, end_date):
                     continue
-                if check_url_format and not is_valid_url(url_text):
-                    continue
-                if date_range and lastmod is not None:
-                    start_date, end_date = map(lambda d: datetime.strptime(d, "%Y-%m-%d"), date_range)
-                    if not is_within_date_range(lastmod.text, start_date, end_date):
-                        continue
-                urls.append(url_text)
+            urls.append(url_text)
 
         return urls
 
     def get_soup(self):
         """Fetch and parse the webpage."""
         try:
-            response = requests.get(self.url, timeout=10)
+            response = SESSION.get(self.url, timeout=10)
             response.raise_for_status()  # Raise HTTP errors
-            return BeautifulSoup(response.text, 'html.parser')
+            return self.parse_soup(response.content)
         except requests.RequestException:
             return None
 
+    @staticmethod
+    def parse_soup(html):
+        """Parse the relevant parts of already fetched HTML (str or raw bytes) into a BeautifulSoup object."""
+        return BeautifulSoup(html, 'lxml', parse_only=RecipeScraper.PARSE_ONLY)
+
+    def build_class_index(self):
+        """
+        Indexes every tag by (tag name, CSS class) in a single pass over the document,
+        so the getters can look up their elements without re-walking the whole DOM.
+
+        Returns:
+            defaultdict: Mapping of (tag name, class) to the list of matching tags.
+        """
+        class_index = defaultdict(list)
+        if not self.soup:
+            return class_index
+
+        for tag in self.soup.find_all(True):
+            for css_class in tag.get('class', ()):
+                class_index[(tag.name, css_class)].append(tag)
+
+        return class_index
+
     def get_title(self):
         """Extracts the recipe title."""
         if not self.soup:
             return 'N/A'
-        title_tag = self.soup.find('h1', class_='p-article__title -recipe pt-10 px-3 mb-5 d-block')
-        return title_tag.text.strip() if title_tag else 'N/A'
+        title_tags = self.class_index.get(('h1', 'p-article__title'))
+        return title_tags[0].text.strip() if title_tags else 'N/A'
 
     def get_recipe_details(self):
         """Extracts the available recipe details (Time, Cost, Difficulty)."""
@@ -97,7 +165,7 @@ class RecipeScraper:
         if not self.soup:
             return details
 
-        detail_sections = self.soup.find_all('div', class_='p-recipe__detailsBody')
+        detail_sections = self.class_index.get(('div', 'p-recipe__detailsBody'), [])
 
         for section in detail_sections:
             label_tag = section.find('span', class_='p-recipe__detailsHeading')
@@ -111,22 +179,28 @@ class RecipeScraper:
 
         return details
 
-    def to_dataframe(self):
-        """Converts extracted recipe details to a pandas DataFrame."""
-        return pd.DataFrame([{
+    def to_record(self):
+        """Returns the extracted recipe details as a plain dict (one DataFrame row)."""
+        return {
             'Recipe name': self.get_title(),
             **self.get_recipe_details()
-        }])
+        }
+
+    def to_dataframe(self):
+        """Converts extracted recipe details to a pandas DataFrame."""
+        return pd.DataFrame([self.to_record()])
 
 
 class IngredientScraper:
     """Class for scraping full details of an ingredient from Nosalty."""
 
     BASE_URL = "https://www.nosalty.hu/alapanyag/"
+    # Only the og:title meta tag is needed from the page
+    PARSE_ONLY = SoupStrainer('meta', property='og:title')
 
-    def __init__(self, url):
+    def __init__(self, url, html=None):
         self.url = url
-        self.soup = self.get_soup()
+        self.soup = self.parse_soup(html) if html is not None else self.get_soup()
 
     @staticmethod
     def extract_urls_from_xml(file_path, check_url_format=False, date_range=None):
@@ -144,52 +218,44 @@ class IngredientScraper:
         """
         def is_valid_url(url):
             """Validates URL format."""
-            pattern = r"^(http|https)://[^\s/$.?#].[^\s]*$"
-            return re.match(pattern, url) is not None
+            return _URL_RE.match(url) is not None
 
         def is_within_date_range(date_text, start_date, end_date):
             """Checks if the date falls within the specified range."""
-            try:
-                date = datetime.strptime(date_text, "%Y-%m-%d")
-                return start_date <= date <= end_date
-            except ValueError:
-                return False
+            date = _parse_lastmod(date_text)
+            return date is not None and start_date <= date <= end_date
 
-        # Define XML namespace
-        namespace = {'ns': 'http://www.sitemaps.org/schemas/sitemap/0.9'}
-
-        # Parse XML
-        tree = ET.parse(file_path)
-        root = tree.getroot()
+        # Parse the range bounds once instead of for every URL
+        if date_range:
+            start_date, end_date = map(lambda d: datetime.strptime(d, "%Y-%m-%d"), date_range)
 
         urls = []
-        for url in root.findall('ns:url', namespace):
-            loc = url.find('ns:loc', namespace)
-            lastmod = url.find('ns:lastmod', namespace)
-
-            if loc is not None:
-                url_text = loc.text
-                if not url_text.startswith(IngredientScraper.BASE_URL):
-                    continue
-                if check_url_format and not is_valid_url(url_text):
+        for url_text, lastmod_text in iter_sitemap_entries(file_path):
+            if not url_text.startswith(IngredientScraper.BASE_URL):
+                continue
+            if check_url_format and not is_valid_url(url_text):
+                continue
+            if date_range and lastmod_text is not None:
+                if not is_within_date_range(lastmod_text, start_date, end_date):
                     continue
-                if date_range and lastmod is not None:
-                    start_date, end_date = map(lambda d: datetime.strptime(d, "%Y-%m-%d"), date_range)
-                    if not is_within_date_range(lastmod.text, start_date, end_date):
-                        continue
-                urls.append(url_text)
+            urls.append(url_text)
 
         return urls
 
     def get_soup(self):
         """Fetch and parse the ingredient webpage."""
         try:
-            response = requests.get(self.url, timeout=10)
+            response = SESSION.get(self.url, timeout=10)
             response.raise_for_status()
-            return BeautifulSoup(response.text, 'html.parser')
+            return self.parse_soup(response.content)
         except requests.RequestException:
             return None
 
+    @staticmethod
+    def parse_soup(html):
+        """Parse the relevant parts of already fetched HTML (str or raw bytes) into a BeautifulSoup object."""
+        return BeautifulSoup(html, 'lxml', parse_only=IngredientScraper.PARSE_ONLY)
+
     def get_ingredient_name(self):
         """Extracts the ingredient name from metadata."""
         if not self.soup:
@@ -197,8 +263,12 @@ class IngredientScraper:
         meta_tag = self.soup.find("meta", property="og:title")
         return meta_tag["content"] if meta_tag and "content" in meta_tag.attrs else "Unknown Ingredient"
 
+    def to_record(self):
+        """Returns the extracted ingredient details as a plain dict (one DataFrame row)."""
+        return {
+            "Ingredient Name": self.get_ingredient_name()
+        }
+
     def to_dataframe(self):
         """Converts extracted ingredient details into a pandas DataFrame."""
-        return pd.DataFrame([{
-            "Ingredient Name": self.get_ingredient_name()
-        }])
+        return pd.DataFrame([self.to_record()])